@@ -11,6 +11,7 @@ import app.enhanced_workflow as enhanced_workflow
 from app.enhanced_workflow import EnhancedWorkflow # Import the class
 from typing import Optional, Dict
 from app.socket_events import register_socketio_events
+from app.workflow_repository import migrate_legacy_updates
 
 def create_app():
     app = Flask(__name__, instance_relative_config=True)
@@ -28,6 +29,7 @@ def create_app():
     # Create database tables if they don't exist
     with app.app_context():
         db.create_all()
+        migrate_legacy_updates()
 
     # Use Flask's built-in logger
     if not app.debug:
@@ -16,6 +16,8 @@ class Config:
         'sqlite:///' + os.path.join(basedir, '..', 'instance', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     DEFAULT_MODEL_NAME = os.environ.get('DEFAULT_MODEL_NAME') or 'gpt-4o'
+    # Texts at or below this many characters are returned as-is by the summarize tool
+    SUMMARY_PASSTHROUGH_CHARS = int(os.environ.get('SUMMARY_PASSTHROUGH_CHARS') or 280)
 
     # Optional: Other configurations if needed
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
@@ -1,5 +1,6 @@
 from .extensions import db # We will create extensions.py next
 import json
+from datetime import datetime, timezone
 from .models import TasksOutput # Import Pydantic model for type hinting
 from typing import Any
 
@@ -11,7 +12,7 @@ class WorkflowSessionDB(db.Model):
     steps_results_json = db.Column(db.Text, nullable=True) # Store Dict[str, Any] as JSON string
     step_statuses_json = db.Column(db.Text, nullable=True) # Store Dict[str, str] as JSON string
     status = db.Column(db.String, default="pending", nullable=False)
-    updates_json = db.Column(db.Text, nullable=True) # Store List[str] as JSON string
+    updates_json = db.Column(db.Text, nullable=True) # Legacy; moved into workflow_updates by migrate_legacy_updates()
     final_result = db.Column(db.Text, nullable=True)
 
     # Helper property to get/set Pydantic TasksOutput
@@ -46,14 +47,17 @@ class WorkflowSessionDB(db.Model):
     def step_statuses(self, value: dict[str, str]):
         self.step_statuses_json = json.dumps(value)
 
-    # Helper property for updates
-    @property
-    def updates(self) -> list[str]:
-         return json.loads(self.updates_json) if self.updates_json else []
+    def __repr__(self):
+        return f'<WorkflowSessionDB {self.id} Status: {self.status}>'
+
+class WorkflowUpdateDB(db.Model):
+    """One progress message of a workflow session; appended, never rewritten."""
+    __tablename__ = 'workflow_updates'
 
-    @updates.setter
-    def updates(self, value: list[str]):
-        self.updates_json = json.dumps(value)
+    seq = db.Column(db.Integer, primary_key=True) # Insertion order; increases across all sessions
+    session_id = db.Column(db.String, db.ForeignKey('workflow_session_db.id'), nullable=False, index=True)
+    ts = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    message = db.Column(db.Text, nullable=False)
 
     def __repr__(self):
-        return f'<WorkflowSessionDB {self.id} Status: {self.status}>' 
\ No newline at end of file
+        return f'<WorkflowUpdateDB {self.session_id}#{self.seq}>' 
\ No newline at end of file
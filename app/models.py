@@ -1,5 +1,5 @@
 import uuid
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import List, Dict, Any, Optional
 
 class Task(BaseModel):
@@ -23,6 +23,8 @@ class WorkflowState(BaseModel):
     status: str = "pending" # Overall workflow status
     updates: List[str] = Field(default_factory=list)
     final_result: Optional[str] = None
+    # How many of `updates` are already stored; None means the state was not loaded from the DB
+    _persisted_updates: Optional[int] = PrivateAttr(default=None)
 
 # --- Added Missing Model Definitions ---
 
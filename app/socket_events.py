@@ -543,7 +543,7 @@ def register_socketio_events(socketio: SocketIO):
         client_sid = request.sid
 
         # Use repository function
-        workflow = get_workflow_state(session_id)
+        workflow = get_workflow_state(session_id, recent_updates=10)
 
         if workflow:
             logger.info(f"Client {client_sid} joining room {session_id} for status check")
@@ -563,7 +563,7 @@ def register_socketio_events(socketio: SocketIO):
             'accepted_plan': workflow.accepted_plan,
             'step_statuses': workflow.step_statuses,
             'final_result': workflow.final_result,
-            'updates': workflow.updates[-10:] # Send recent updates
+            'updates': workflow.updates # Send recent updates (only the last 10 are loaded)
         }
         # Send plan summary and task titles/ids/status, not full plan details
         if workflow.plan:
@@ -2,6 +2,8 @@ import os
 import functools
 import logging
 import json
+import re
+import orjson
 from typing import Dict, Any, List # Ensure List is imported
 
 # Imports for specific tools
@@ -12,38 +14,106 @@ from pydantic import BaseModel # Needed for generate_report
 # Import Pydantic models used by tools (adjust path if models are also moved)
 from .models import ResearchFinding, AnalysisResult
 
+try:
+    import numba
+except ImportError: # numba is optional; fall back to a pure-Python counter
+    numba = None
+
 logger = logging.getLogger(__name__)
 
-# --- Security Decorator --- (Moved from agent_registry.py)
-def require_safe_path(func):
-    """Decorator to ensure file paths are within the workspace."""
-    @functools.wraps(func)
-    async def wrapper(filepath: str, *args, **kwargs):
-        try:
-            # Determine workspace root relative to this file's location
-            # Assumes tools.py is in app/ directory
-            WORKSPACE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-            absolute_filepath = os.path.abspath(os.path.join(WORKSPACE_ROOT, 'instance', filepath)) # Target instance folder by default
-
-            # Check if the path is within the instance folder inside the workspace
-            instance_folder_path = os.path.abspath(os.path.join(WORKSPACE_ROOT, 'instance'))
-            if os.path.commonpath([instance_folder_path]) != os.path.commonpath([instance_folder_path, absolute_filepath]):
-                logger.error(f"Security Error: Attempted file access outside instance folder: {filepath} resolved to {absolute_filepath}")
-                return "Error: File access outside allowed workspace/instance folder is forbidden."
-
-            # Ensure directory exists for write operations
-            if 'content' in kwargs or (args and isinstance(args[0], str)): # Heuristic for write/append
-                dir_path = os.path.dirname(absolute_filepath)
-                os.makedirs(dir_path, exist_ok=True)
-
-            return await func(absolute_filepath, *args, **kwargs)
-        except Exception as e:
-            logger.error(f"Error during safe path check or execution for {filepath}: {e}", exc_info=True)
-            return f"Error processing file path or executing function: {e}"
-    return wrapper
+# --- Internal Agent Configuration ---
+# Built once at import and shared by every internal agent instance
+_SUMMARIZER_INSTRUCTIONS = "Summarize the following text concisely and accurately, capturing the main points."
+_ANALYZER_INSTRUCTIONS = (
+    "Analyze the following text. Determine the overall sentiment (positive, negative, neutral), "
+    "extract the top 3-5 key phrases, provide a concise one-sentence summary, "
+    "and count the total number of words. Output the results as a JSON object matching the TextAnalysisOutput format."
+)
+_NO_TOOL_SETTINGS = ModelSettings(tool_choice="none")
+
+# --- Word Counting ---
+# Both backends split on exactly the characters str.split() treats as whitespace (str.isspace()),
+# which is also what the regex \s matches for str patterns.
+_NON_SPACE_RUN_RE = re.compile(r'\S+')
+
+if numba is not None:
+    @numba.njit(cache=True, boundscheck=False)
+    def _is_space(cp: int) -> bool:
+        return (
+            (9 <= cp <= 13) or (28 <= cp <= 32) or cp == 0x85 or cp == 0xA0 or cp == 0x1680
+            or (0x2000 <= cp <= 0x200A) or cp == 0x2028 or cp == 0x2029 or cp == 0x202F
+            or cp == 0x205F or cp == 0x3000
+        )
+
+    @numba.njit(cache=True, boundscheck=False)
+    def _wc(buf: bytes) -> int:
+        """Counts whitespace-separated words in a UTF-8 byte buffer."""
+        count = 0
+        in_word = False
+        i = 0
+        n = len(buf)
+        while i < n:
+            # Decode one code point; the buffer always comes from str.encode, so it is well-formed
+            b = buf[i]
+            if b < 0x80:
+                cp = b
+                i += 1
+            elif b < 0xE0:
+                cp = ((b & 0x1F) << 6) | (buf[i + 1] & 0x3F)
+                i += 2
+            elif b < 0xF0:
+                cp = ((b & 0x0F) << 12) | ((buf[i + 1] & 0x3F) << 6) | (buf[i + 2] & 0x3F)
+                i += 3
+            else:
+                cp = ((b & 0x07) << 18) | ((buf[i + 1] & 0x3F) << 12) | ((buf[i + 2] & 0x3F) << 6) | (buf[i + 3] & 0x3F)
+                i += 4
+            if _is_space(cp):
+                in_word = False
+            elif not in_word:
+                in_word = True
+                count += 1
+        return count
+
+    # Compile (or load from the on-disk cache) at import so the first request doesn't pay for it
+    try:
+        _wc(b"warmup")
+    except Exception as e:
+        logger.warning(f"Numba word counter unavailable, using pure-Python fallback: {e}")
+        _wc = None
+else:
+    _wc = None
+
+def word_count(text: str) -> int:
+    """Counts words in text the way len(text.split()) does, without materializing the tokens."""
+    if _wc is not None:
+        # surrogatepass keeps lone surrogates as (non-space) characters, matching the fallback
+        return _wc(text.encode('utf-8', errors='surrogatepass'))
+    return sum(1 for _ in _NON_SPACE_RUN_RE.finditer(text))
+
+# --- Path Safety --- (Moved from agent_registry.py)
+# File tools are confined to the instance folder inside the workspace
+# Assumes tools.py is in app/ directory
+WORKSPACE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+INSTANCE_FOLDER = os.path.join(WORKSPACE_ROOT, 'instance')
+
+def resolve_safe_path(filepath: str) -> str | None:
+    """Resolves a path relative to the instance folder, or returns None if it escapes it."""
+    absolute_filepath = os.path.abspath(os.path.join(INSTANCE_FOLDER, filepath))
+    if os.path.commonpath([INSTANCE_FOLDER]) != os.path.commonpath([INSTANCE_FOLDER, absolute_filepath]):
+        logger.error(f"Security Error: Attempted file access outside instance folder: {filepath} resolved to {absolute_filepath}")
+        return None
+    return absolute_filepath
+
+FORBIDDEN_PATH_MESSAGE = "Error: File access outside allowed workspace/instance folder is forbidden."
 
 # --- Tool Definitions --- (Moved from various files)
 
+# Placeholder rules returned by rulebook_parser_tool; only the query/source fields are filled in per call
+_STUB_RULEBOOK_SECTIONS = (
+    ("Rule A.1", "Section A, Rule 1"),
+    ("Rule B.3", "Section B, Rule 3"),
+)
+
 # Moved from agent_registry.py
 @function_tool
 async def rulebook_parser_tool(source_identifier: str, query: str) -> List[Dict[str, Any]]:
@@ -53,10 +123,11 @@ async def rulebook_parser_tool(source_identifier: str, query: str) -> List[Dict[
         source_identifier: The URL or path to the rulebook.
         query: The specific information to search for (e.g., 'Non Pro eligibility').
     """
-    logger.info(f"[TOOL STUB] Parsing rulebook '{source_identifier}' for query: '{query}'")
+    logger.info("[TOOL STUB] Parsing rulebook '%s' for query: '%s'", source_identifier, query)
+    prefix = f"Placeholder rule about {query} from {source_identifier} - "
     return [
-        {"content": f"Placeholder rule about {query} from {source_identifier} - Rule A.1", "source_type": "rulebook", "source_identifier": source_identifier, "page_or_section": "Section A, Rule 1"},
-        {"content": f"Placeholder rule about {query} from {source_identifier} - Rule B.3", "source_type": "rulebook", "source_identifier": source_identifier, "page_or_section": "Section B, Rule 3"}
+        {"content": prefix + rule, "source_type": "rulebook", "source_identifier": source_identifier, "page_or_section": section}
+        for rule, section in _STUB_RULEBOOK_SECTIONS
     ]
 
 # Moved from agent_registry.py
@@ -97,20 +168,21 @@ async def citation_formatter_tool(finding_json: str) -> str:
 
 # Moved from agent_registry.py
 @function_tool
-@require_safe_path
 async def read_file_content(filepath: str) -> str:
     """Reads the content of a specified file within the workspace instance folder.
     Args:
         filepath: The relative path to the file within the workspace instance folder.
     """
-    # The decorator now handles path resolution and security checks
-    logger.info(f"Attempting to read file via tool: {filepath}")
+    logger.info("Attempting to read file via tool: %s", filepath)
+    absolute_filepath = resolve_safe_path(filepath)
+    if absolute_filepath is None:
+        return FORBIDDEN_PATH_MESSAGE
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open(absolute_filepath, 'r', encoding='utf-8') as f:
             content = f.read()
             MAX_SIZE = 1 * 1024 * 1024
             if len(content.encode('utf-8')) > MAX_SIZE:
-                logger.warning(f"File content truncated: {filepath}")
+                logger.warning("File content truncated: %s", filepath)
                 # Truncate based on bytes, approximating characters
                 truncated_content = content[:MAX_SIZE] # Simple char slice, might cut mid-multibyte char
                 return truncated_content + "\n... [Content Truncated] ..."
@@ -119,13 +191,11 @@ async def read_file_content(filepath: str) -> str:
         logger.error(f"File not found by tool: {filepath}")
         return "Error: File not found."
     except Exception as e:
-        # Decorator might catch some, but keep specific handling here too
         logger.error(f"Error reading file {filepath} in tool: {e}", exc_info=True)
         return f"Error reading file: {e}"
 
 # Moved from agent_registry.py
 @function_tool
-@require_safe_path
 async def write_to_file(filepath: str, content: str, append: bool) -> Dict[str, str]:
     """Writes or appends content to a specified file within the workspace instance folder.
     You MUST specify the 'append' argument explicitly (True or False).
@@ -136,14 +206,17 @@ async def write_to_file(filepath: str, content: str, append: bool) -> Dict[str,
         content: The content to write.
         append: Set to True to append to the file, False to overwrite it.
     """
-    logger.info(f"Attempting to write to file via tool: {filepath} (append={append})")
+    logger.info("Attempting to write to file via tool: %s (append=%s)", filepath, append)
+    absolute_filepath = resolve_safe_path(filepath)
+    if absolute_filepath is None:
+        return FORBIDDEN_PATH_MESSAGE
     mode = 'a' if append else 'w'
     try:
-        base_filename = os.path.basename(filepath)
-        absolute_filepath = filepath # Decorator handles resolving this path
+        base_filename = os.path.basename(absolute_filepath)
+        os.makedirs(os.path.dirname(absolute_filepath), exist_ok=True)
         with open(absolute_filepath, mode, encoding='utf-8') as f:
             f.write(content)
-        logger.info(f"Successfully wrote to {absolute_filepath}")
+        logger.info("Successfully wrote to %s", absolute_filepath)
         # Return structured dictionary on success
         return {'type': 'file_artifact', 'filename': base_filename}
     except Exception as e:
@@ -151,6 +224,17 @@ async def write_to_file(filepath: str, content: str, append: bool) -> Dict[str,
         # Return error string on failure
         return f"Error writing to file: {e}"
 
+@functools.lru_cache(maxsize=None)
+def _summarizer_agent(model: str) -> Agent:
+    """Returns the internal summarizer agent for a model, creating it on first use."""
+    return Agent(
+        name="Internal Summarizer Agent",
+        instructions=_SUMMARIZER_INSTRUCTIONS,
+        model=model,
+        tools=[],
+        model_settings=_NO_TOOL_SETTINGS
+    )
+
 # Moved from agent_registry.py (simple_summarizer) & agents_core.py (summarize_text)
 # This version uses an internal agent for better summaries than simple_summarizer
 @function_tool
@@ -162,15 +246,12 @@ async def summarize_text_agent(text: str) -> str:
         A summary of the provided text.
     """
     try:
+        # Text this short is already its own summary; skip the LLM round-trip
+        if len(text) <= current_app.config.get('SUMMARY_PASSTHROUGH_CHARS', 280):
+            return text
         summarizer_model = current_app.config.get('DEFAULT_MODEL_NAME', 'gpt-4o')
-        summarizer_agent = Agent(
-            name="Internal Summarizer Agent",
-            instructions="Summarize the following text concisely and accurately, capturing the main points.",
-            model=summarizer_model,
-            tools=[],
-            model_settings=ModelSettings(tool_choice="none")
-        )
-        logger.info(f"Running internal summarizer agent on text (length: {len(text)})...")
+        summarizer_agent = _summarizer_agent(summarizer_model)
+        logger.info("Running internal summarizer agent on text (length: %d)...", len(text))
         result = await Runner.run(summarizer_agent, text)
         summary = getattr(result, 'final_output', 'Could not generate summary.')
         logger.info("Internal summarizer agent finished.")
@@ -191,6 +272,9 @@ def calculate_sum(a: float, b: float) -> float:
     """
     return a + b
 
+# Any run of 19+ digits may be an integer outside orjson's 64-bit range
+_LONG_DIGIT_RUN_RE = re.compile(r'\d{19}')
+
 # Moved from enhanced_workflow_execution_agent.py
 @function_tool
 def format_data(data: str, format_type: str) -> str:
@@ -204,9 +288,18 @@ def format_data(data: str, format_type: str) -> str:
     effective_format_type = format_type.lower() if format_type else "json"
     try:
         if effective_format_type == "json":
-            # Attempt to parse/re-serialize for validation, otherwise basic wrap
-            try: return json.dumps(json.loads(data)) # If data is valid JSON
-            except: return json.dumps({"data": data}) # Basic wrap
+            # Only text starting like an object/array can be valid JSON worth re-serializing
+            stripped = data.lstrip()
+            if stripped and stripped[0] in '{[':
+                # orjson silently turns integers wider than 64 bits into floats, so long digit runs skip it
+                if not _LONG_DIGIT_RUN_RE.search(data):
+                    try: return orjson.dumps(orjson.loads(data)).decode() # If data is valid JSON
+                    except (orjson.JSONDecodeError, orjson.JSONEncodeError): pass # e.g. lone surrogates, deep nesting
+                # Stdlib path for anything orjson can't round-trip faithfully
+                try: return json.dumps(json.loads(data), separators=(',', ':'), ensure_ascii=False)
+                except ValueError: pass
+            try: return orjson.dumps({"data": data}).decode() # Basic wrap
+            except orjson.JSONEncodeError: return json.dumps({"data": data}, separators=(',', ':'), ensure_ascii=False) # e.g. lone surrogates
         elif effective_format_type == "xml":
             # Basic wrapping, real XML handling is complex
             return f"<data>{data}</data>"
@@ -227,6 +320,18 @@ class TextAnalysisOutput(BaseModel):
     summary: str
     word_count: int
 
+@functools.lru_cache(maxsize=None)
+def _analysis_agent(model: str) -> Agent:
+    """Returns the internal text analysis agent for a model, creating it on first use."""
+    return Agent(
+        name="Internal Text Analysis Agent",
+        instructions=_ANALYZER_INSTRUCTIONS,
+        model=model,
+        output_type=TextAnalysisOutput,
+        tools=[],
+        model_settings=_NO_TOOL_SETTINGS
+    )
+
 @function_tool
 async def analyze_text_agent(text: str) -> Dict[str, Any]:
     """Analyze text for sentiment, key phrases, and summary using an internal agent.
@@ -235,22 +340,11 @@ async def analyze_text_agent(text: str) -> Dict[str, Any]:
     Returns:
         Dictionary with analysis results (sentiment, key_phrases, summary, word_count)
     """
-    logger.info(f"Running internal analysis agent on text (length: {len(text)})...")
+    logger.info("Running internal analysis agent on text (length: %d)...", len(text))
     try:
         # Assuming parent agent's model is accessible via config or passed context if needed
         analyzer_model = current_app.config.get('DEFAULT_MODEL_NAME', 'gpt-4o')
-        analysis_agent = Agent(
-            name="Internal Text Analysis Agent",
-            instructions=(
-                "Analyze the following text. Determine the overall sentiment (positive, negative, neutral), "
-                "extract the top 3-5 key phrases, provide a concise one-sentence summary, "
-                "and count the total number of words. Output the results as a JSON object matching the TextAnalysisOutput format."
-            ),
-            model=analyzer_model,
-            output_type=TextAnalysisOutput,
-            tools=[],
-            model_settings=ModelSettings(tool_choice="none")
-        )
+        analysis_agent = _analysis_agent(analyzer_model)
         result = await Runner.run(analysis_agent, text)
         analysis_output = result.final_output_as(TextAnalysisOutput)
         logger.info("Internal analysis agent finished.")
@@ -260,7 +354,7 @@ async def analyze_text_agent(text: str) -> Dict[str, Any]:
         return {
             "error": "Failed to analyze text due to an internal error.",
             "sentiment": "unknown", "key_phrases": [], "summary": "Analysis failed.",
-            "word_count": len(text.split())
+            "word_count": word_count(text)
         }
 
 # Moved from enhanced_workflow_execution_agent.py
@@ -269,6 +363,14 @@ class ReportSection(BaseModel):
     heading: str
     content: str
 
+def _is_plain_section(section_data: Any) -> bool:
+    return (
+        isinstance(section_data, dict)
+        and section_data.keys() == {"heading", "content"}
+        and isinstance(section_data["heading"], str)
+        and isinstance(section_data["content"], str)
+    )
+
 @function_tool
 def generate_report_tool(title: str, sections_json: str) -> str:
     """Generate a formatted report from a title and sections data.
@@ -278,18 +380,23 @@ def generate_report_tool(title: str, sections_json: str) -> str:
     Returns:
         Formatted report as a string
     """
-    report = f"# {title}\n\n"
+    parts = [f"# {title}\n\n"]
     try:
         sections = json.loads(sections_json)
         # Validate structure minimally
         if not isinstance(sections, list):
             raise ValueError("sections_json did not decode to a list")
 
-        for section_data in sections:
-             # Use Pydantic for validation per section
-            section = ReportSection(**section_data)
-            report += f"## {section.heading}\n\n{section.content}\n\n"
-        return report
+        # Sections that are already plain {heading: str, content: str} dicts need no model validation
+        if all(_is_plain_section(s) for s in sections):
+            for section_data in sections:
+                parts.append(f"## {section_data['heading']}\n\n{section_data['content']}\n\n")
+        else:
+            for section_data in sections:
+                # Use Pydantic for validation per section
+                section = ReportSection(**section_data)
+                parts.append(f"## {section.heading}\n\n{section.content}\n\n")
+        return "".join(parts)
     except Exception as e:
         logger.error(f"Error generating report: {e}", exc_info=True)
         return f"Error: Failed to generate report sections - {e}"
@@ -4,7 +4,7 @@ import json
 from typing import Optional
 
 from .extensions import db
-from .database_models import WorkflowSessionDB
+from .database_models import WorkflowSessionDB, WorkflowUpdateDB
 from .models import WorkflowState, TasksOutput, Task # Updated imports
 
 logger = logging.getLogger(__name__)
@@ -17,8 +17,55 @@ def get_workflow_db(session_id: str) -> Optional[WorkflowSessionDB]:
     """Gets the WorkflowSessionDB object from the database."""
     return WorkflowSessionDB.query.get(session_id)
 
-def load_workflow_state(session_id: str) -> Optional[WorkflowState]:
-    """Loads the workflow state from the database and returns a Pydantic model."""
+def get_workflow_updates(session_id: str, limit: Optional[int] = None) -> list[str]:
+    """Returns a session's update messages in order, optionally only the most recent `limit`."""
+    query = db.session.query(WorkflowUpdateDB.message).filter(WorkflowUpdateDB.session_id == session_id)
+    if limit is None:
+        return [message for (message,) in query.order_by(WorkflowUpdateDB.seq)]
+    recent = query.order_by(WorkflowUpdateDB.seq.desc()).limit(limit).all()
+    return [message for (message,) in reversed(recent)]
+
+def _append_update(session_id: str, message: str):
+    """Stages an INSERT of a single update message; the caller commits."""
+    db.session.add(WorkflowUpdateDB(session_id=session_id, message=message))
+
+def _stage_updates(workflow: WorkflowState):
+    """Stages the INSERTs (and DELETEs) needed to store `workflow.updates`; the caller commits.
+
+    A loaded state only inserts the messages appended since it was loaded, so saves from
+    concurrently loaded states don't drop each other's messages. A state that was built
+    from scratch replaces the session's history.
+    """
+    persisted = workflow._persisted_updates
+    if persisted is None:
+        WorkflowUpdateDB.query.filter_by(session_id=workflow.session_id).delete(synchronize_session=False)
+        persisted = 0
+    db.session.add_all(
+        WorkflowUpdateDB(session_id=workflow.session_id, message=message)
+        for message in workflow.updates[persisted:]
+    )
+
+def migrate_legacy_updates():
+    """Moves update histories still stored in the legacy updates_json column into workflow_updates."""
+    legacy_sessions = WorkflowSessionDB.query.filter(WorkflowSessionDB.updates_json.isnot(None)).all()
+    if not legacy_sessions:
+        return
+    for session_db in legacy_sessions:
+        try:
+            messages = json.loads(session_db.updates_json)
+        except ValueError:
+            logger.error(f"Skipping unreadable legacy updates for session {session_db.id}.")
+            continue
+        db.session.add_all(WorkflowUpdateDB(session_id=session_db.id, message=message) for message in messages)
+        session_db.updates_json = None
+    db.session.commit()
+    logger.info(f"Migrated legacy updates for {len(legacy_sessions)} workflow session(s).")
+
+def load_workflow_state(session_id: str, recent_updates: Optional[int] = None) -> Optional[WorkflowState]:
+    """Loads the workflow state from the database and returns a Pydantic model.
+
+    If recent_updates is given, only that many of the latest update messages are loaded.
+    """
     session_db = get_workflow_db(session_id)
     if not session_db:
         logger.warning(f"Workflow session {session_id} not found in DB.")
@@ -36,9 +83,10 @@ def load_workflow_state(session_id: str) -> Optional[WorkflowState]:
             steps_results=session_db.steps_results, # Keeps name, DB stores results dict
             step_statuses=session_db.step_statuses, # Keeps name, DB stores status dict
             status=session_db.status,
-            updates=session_db.updates, # Uses the @property getter
+            updates=get_workflow_updates(session_id, limit=recent_updates),
             final_result=session_db.final_result
         )
+        state._persisted_updates = len(state.updates)
         
         # Initialize statuses if loading an accepted plan without statuses yet
         if state.plan and state.accepted_plan and not state.step_statuses:
@@ -68,10 +116,11 @@ def save_workflow_state(workflow: WorkflowState) -> bool:
         session_db.steps_results = workflow.steps_results # Setter receives results dict
         session_db.step_statuses = workflow.step_statuses # Setter receives status dict
         session_db.status = workflow.status
-        session_db.updates = workflow.updates # Setter receives updates list
+        _stage_updates(workflow) # Only messages appended since load are inserted
         session_db.final_result = workflow.final_result
 
         db.session.commit()
+        workflow._persisted_updates = len(workflow.updates)
         return True
     except Exception as e:
         logger.error(f"Failed to save session state {workflow.session_id} to DB: {e}", exc_info=True)
@@ -92,26 +141,38 @@ def create_workflow_session() -> str:
         logger.error(f"Failed to create workflow session entry: {e}", exc_info=True)
         raise
 
-def get_workflow_state(session_id: str) -> Optional[WorkflowState]:
+def get_workflow_state(session_id: str, recent_updates: Optional[int] = None) -> Optional[WorkflowState]:
     """Retrieves the current state of a workflow session from the database."""
-    return load_workflow_state(session_id)
+    return load_workflow_state(session_id, recent_updates=recent_updates)
 
 def accept_plan(session_id: str) -> bool:
-    """Loads a workflow, marks its plan as accepted, initializes statuses, and saves back to DB."""
-    workflow = load_workflow_state(session_id)
-    if not workflow:
-        logger.warning(f"Cannot accept plan for session {session_id}: Workflow state not found.")
-        return False
-    if not workflow.plan:
-        logger.warning(f"Cannot accept plan for session {session_id}: No plan found in state.")
-        return False
-
-    workflow.accepted_plan = True
-    workflow.status = "accepted"
-    # Initialize task statuses upon acceptance, using plan.tasks
-    workflow.step_statuses = {task.id: STATUS_PENDING for task in workflow.plan.tasks}
-    workflow.steps_results = {} # Clear previous results
-    workflow.updates.append("Plan accepted by user. Ready for execution.")
+    """Marks a session's plan as accepted and initializes statuses in a single locked update."""
+    try:
+        # Lock the row so concurrent accept requests cannot interleave
+        session_db = WorkflowSessionDB.query.with_for_update().filter_by(id=session_id).first()
+        if not session_db:
+            logger.warning(f"Cannot accept plan for session {session_id}: Workflow state not found.")
+            db.session.rollback()
+            return False
+        if not session_db.plan_json:
+            logger.warning(f"Cannot accept plan for session {session_id}: No plan found in state.")
+            db.session.rollback()
+            return False
+
+        # Read task IDs straight from the stored JSON instead of validating the full TasksOutput
+        tasks = json.loads(session_db.plan_json).get('tasks', [])
+
+        session_db.accepted_plan = True
+        session_db.status = "accepted"
+        # Initialize task statuses upon acceptance, using plan.tasks
+        session_db.step_statuses = {task['id']: STATUS_PENDING for task in tasks}
+        session_db.steps_results = {} # Clear previous results
+        _append_update(session_id, "Plan accepted by user. Ready for execution.")
 
-    logger.info(f"Marking plan accepted for session {session_id}. Initialized task statuses.")
-    return save_workflow_state(workflow) 
\ No newline at end of file
+        db.session.commit()
+        logger.info(f"Marking plan accepted for session {session_id}. Initialized task statuses.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to accept plan for session {session_id}: {e}", exc_info=True)
+        db.session.rollback()
+        return False
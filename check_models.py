@@ -3,93 +3,214 @@ This script analyzes all Python files in the project to detect any
 Pydantic model classes with default values that could cause issues with the OpenAI Responses API.
 """
 
+import ast
+import json
+import mmap
 import os
-import re
 import sys
-from colorama import init, Fore, Style
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 
-# Initialize colorama for colored output
-init()
+# Colored output only when writing to a terminal; piped/CI output gets plain text
+if sys.stdout.isatty():
+    from colorama import Fore, Style
+    if os.name == 'nt':
+        # Windows consoles need colorama to translate ANSI escape codes
+        from colorama import init
+        init()
+else:
+    class _NoColor:
+        """Stand-in for colorama's Fore/Style where every color is an empty string."""
+        def __getattr__(self, name):
+            return ''
+    Fore = Style = _NoColor()
 
-# Regular expressions for detecting Pydantic model class definitions and attributes with default values
-CLASS_PATTERN = r'class\s+(\w+)\s*\(\s*BaseModel\s*\)'
-FIELD_PATTERN = r'(\w+)\s*:\s*(?:Optional\[)?(\w+)(?:\])?\s*=\s*(?!Field\(default_factory)(.*?)$'
+# Directories to ignore
+IGNORE_DIRS = frozenset({
+    '.git', 'venv', '.venv', '__pycache__', '.vscode', 'node_modules',
+    '.mypy_cache', '.pytest_cache', '.ruff_cache', '.tox', '.nox', 'build', 'dist',
+})
 
-# List of directories to ignore
-IGNORE_DIRS = ['.git', 'venv', '__pycache__', '.vscode']
+# Trees with fewer Python files than this are scanned in-process
+PARALLEL_MIN_FILES = 64
+
+# Per-file results are cached here (inside the scanned directory) and reused while a file's mtime and size are unchanged.
+# Bump CACHE_VERSION whenever scan_file's output changes so stale results are discarded.
+CACHE_FILENAME = '.check_models_cache.json'
+CACHE_VERSION = 1
+
+def file_contains_all(file_path, needles):
+    """Check whether a file contains every byte string in needles, without reading or decoding it."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return False  # Empty files can't be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return all(mm.find(needle) != -1 for needle in needles)
+
+def _base_name(node):
+    """Return the trailing name of a Name/Attribute node (e.g. 'BaseModel' for pydantic.BaseModel)."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+def _is_none_or_ellipsis(node):
+    return isinstance(node, ast.Constant) and (node.value is None or node.value is Ellipsis)
+
+def _is_model_field(stmt):
+    """Return True if an annotated class-body assignment declares a Pydantic field.
+    
+    Underscore-prefixed names, ClassVar[...] annotations and PrivateAttr(...) values are not fields.
+    """
+    if stmt.target.id.startswith('_'):
+        return False
+    annotation = stmt.annotation.value if isinstance(stmt.annotation, ast.Subscript) else stmt.annotation
+    if _base_name(annotation) == 'ClassVar':
+        return False
+    return not (isinstance(stmt.value, ast.Call) and _base_name(stmt.value.func) == 'PrivateAttr')
+
+def has_problematic_default(value):
+    """Return True if a field's assigned value gives it a default other than None."""
+    if isinstance(value, ast.Call) and _base_name(value.func) == 'Field':
+        keywords = {kw.arg: kw.value for kw in value.keywords}
+        # Field(default_factory=...) is fine, and Field() without a default marks a required field
+        if 'default_factory' in keywords:
+            return False
+        value = value.args[0] if value.args else keywords.get('default')
+        if value is None:
+            return False
+    return not _is_none_or_ellipsis(value)
+
+def _field_type(annotation):
+    """Return the annotation as source, unwrapping Optional[...]."""
+    if isinstance(annotation, ast.Subscript) and _base_name(annotation.value) == 'Optional':
+        annotation = annotation.slice
+    return ast.unparse(annotation)
 
 def scan_file(file_path):
-    """Scan a Python file for Pydantic model classes with default values."""
+    """Scan a Python file for Pydantic model classes with default values.
+    
+    Returns the list of issues found, or None if the file could not be read or parsed.
+    """
     issues = []
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Check if this is a Python file that imports BaseModel
-        if 'BaseModel' not in content:
+        # Check if this is a Python file that imports BaseModel and defines classes
+        if not file_contains_all(file_path, (b'BaseModel', b'class')):
             return []
             
-        lines = content.split('\n')
-        current_class = None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        lines = None
         
-        for i, line in enumerate(lines):
-            # Check for class definition
-            class_match = re.search(CLASS_PATTERN, line)
-            if class_match:
-                current_class = class_match.group(1)
+        for node in ast.walk(ast.parse(content, filename=file_path)):
+            if not isinstance(node, ast.ClassDef):
                 continue
+            if not any(_base_name(base) == 'BaseModel' for base in node.bases):
+                continue
+            
+            # Only annotated assignments directly in the class body are fields
+            for stmt in node.body:
+                if not (isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name)):
+                    continue
+                if not _is_model_field(stmt):
+                    continue
+                if stmt.value is None or not has_problematic_default(stmt.value):
+                    continue
                 
-            # Check for field with default value
-            if current_class:
-                field_match = re.search(FIELD_PATTERN, line)
-                if field_match:
-                    field_name = field_match.group(1)
-                    field_type = field_match.group(2)
-                    default_value = field_match.group(3).strip()
-                    
-                    # Skip if the default is None (Optional fields are fine)
-                    if default_value == 'None':
-                        continue
-                        
-                    # Skip if the default is using Field(default_factory=...)
-                    if 'Field(default_factory=' in line:
-                        continue
-                        
-                    issues.append({
-                        'file': file_path,
-                        'line': i + 1,
-                        'class': current_class,
-                        'field': field_name,
-                        'type': field_type,
-                        'default': default_value,
-                        'content': line.strip()
-                    })
-                
-                # Check if we're leaving the class definition (indentation changes)
-                elif line and not line.startswith(' ') and not line.startswith('\t'):
-                    current_class = None
+                if lines is None:
+                    # Only '\n' ends a line for ast; splitlines() also breaks on \x0c, \x1c-\x1e, \x85, \u2028 etc.
+                    lines = content.split('\n')
+                issues.append({
+                    'file': file_path,
+                    'line': stmt.lineno,
+                    'class': node.name,
+                    'field': stmt.target.id,
+                    'type': _field_type(stmt.annotation),
+                    'default': ast.get_source_segment(content, stmt.value),
+                    'content': lines[stmt.lineno - 1].strip()
+                })
                     
     except Exception as e:
         print(f"Error scanning {file_path}: {e}")
+        return None
     
     return issues
 
-def scan_directory(directory):
-    """Recursively scan a directory for Python files with Pydantic models."""
-    issues = []
+def find_python_files(directory):
+    """Recursively yield os.DirEntry objects for the Python files under a directory."""
+    stack = [directory]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue  # Unreadable directory; os.walk skipped these silently too
+        with entries:
+            for entry in entries:
+                # DirEntry caches the file type from the directory listing, avoiding a stat per entry
+                if entry.is_dir(follow_symlinks=False):
+                    # Skip ignored directories
+                    if entry.name not in IGNORE_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith('.py') and entry.is_file():
+                    yield entry
+
+def load_cache(cache_path):
+    """Load per-file scan results from a previous run, or an empty cache if unusable."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache['files']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return {}
+
+def save_cache(cache_path, files):
+    try:
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'files': files}, f)
+    except OSError as e:
+        print(f"Could not write scan cache {cache_path}: {e}")
+
+def scan_directory(directory, cache_path=None):
+    """Recursively scan a directory for Python files with Pydantic models.
     
-    for root, dirs, files in os.walk(directory):
-        # Skip ignored directories
-        dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-        
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                file_issues = scan_file(file_path)
-                issues.extend(file_issues)
+    If cache_path is given, files whose mtime and size match the cached entry are not rescanned.
+    Files that fail to scan are left out of the cache so the next run retries them.
+    """
+    cached_files = load_cache(cache_path) if cache_path else {}
+    files = {}
+    stale_paths = []
     
-    return issues
+    for entry in find_python_files(directory):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        cached = cached_files.get(entry.path)
+        if cached and cached['mtime_ns'] == stat.st_mtime_ns and cached['size'] == stat.st_size:
+            files[entry.path] = cached
+        else:
+            files[entry.path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+            stale_paths.append(entry.path)
+    
+    # Worker start-up outweighs the scan itself on small batches
+    if len(stale_paths) < PARALLEL_MIN_FILES:
+        results = list(map(scan_file, stale_paths))
+    else:
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(scan_file, stale_paths, chunksize=32))
+    for path, issues in zip(stale_paths, results):
+        if issues is None:
+            del files[path]
+        else:
+            files[path]['issues'] = issues
+    
+    if cache_path:
+        save_cache(cache_path, files)
+    return list(chain.from_iterable(entry['issues'] for entry in files.values()))
 
 def main():
     # Determine the base directory to scan
@@ -99,7 +220,7 @@ def main():
         base_dir = '.'
     
     print(f"Scanning for Pydantic models with default values in {base_dir}...")
-    issues = scan_directory(base_dir)
+    issues = scan_directory(base_dir, cache_path=os.path.join(base_dir, CACHE_FILENAME))
     
     if not issues:
         print(f"\n{Fore.GREEN}✓ No problematic default values found in Pydantic models.{Style.RESET_ALL}")